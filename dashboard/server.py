@@ -1,36 +1,214 @@
+# Patch blocking stdlib I/O before anything else imports it, so Flask and
+# Socket.IO share eventlet's cooperative loop
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, render_template, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_socketio import SocketIO, emit
 import sqlite3
-import json
+import orjson
+import zlib
 import threading
 import time
-import base64
-import cv2
 from datetime import datetime
 import requests
 import os
 import secrets
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 dashboard_secret_key = os.getenv('DASHBOARD_SECRET_KEY')
 if not dashboard_secret_key:
     dashboard_secret_key = secrets.token_hex(32)
     print("⚠️  DASHBOARD_SECRET_KEY not set; generated an ephemeral secret key")
 app.config['SECRET_KEY'] = dashboard_secret_key
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*")
+
+DB_PATH = 'rescue_missions.db'
+# Camera frames live in their own file so blob writes don't churn the mission DB
+FEEDS_DB_PATH = 'camera_feeds.db'
+PERSIST_CAMERA_FRAMES = os.getenv('DASHBOARD_PERSIST_FRAMES', 'false').lower() == 'true'
+DB_OPTIMIZE_INTERVAL = 15 * 60  # seconds between PRAGMA optimize runs
+DB_READER_POOL_SIZE = 4
+WRITE_BATCH_SIZE = 128
+WRITE_BATCH_WINDOW = 0.02  # seconds to wait for more writes before committing
+CLIENT_QUEUE_SIZE = 32
+LIVE_FEED_LIMIT = 64  # most recently active missions whose latest frame is kept
+FRAME_RETENTION = 10 * 60  # seconds of persisted frames kept per mission
+
+# Statement text is shared so SQLite's statement cache reuses the prepared form
+SQL_INSERT_MISSION = '''
+INSERT INTO missions (mission_id, rover_name, status, start_time, survivor_detected, analysis_complete)
+VALUES (?, ?, 'ACTIVE', datetime('now', 'localtime'), 0, 0)
+'''
+SQL_MARK_SURVIVOR_DETECTED = 'UPDATE missions SET survivor_detected = ? WHERE mission_id = ?'
+SQL_MARK_ANALYSIS_COMPLETE = 'UPDATE missions SET analysis_complete = ? WHERE mission_id = ?'
+SQL_INSERT_EVENT = '''
+INSERT INTO mission_events (mission_id, event_type, event_data)
+VALUES (?, ?, ?)
+'''
+SQL_INSERT_ANALYSIS = '''
+INSERT INTO survivor_analysis
+(mission_id, detection_confidence, medical_analysis, injury_severity, recommended_action)
+VALUES (?, ?, ?, ?, ?)
+'''
+SQL_INSERT_FRAME = 'INSERT INTO frames (mission_id, ts, jpeg) VALUES (?, ?, ?)'
+SQL_PRUNE_FRAMES = 'DELETE FROM frames WHERE mission_id = ? AND ts < ?'
+
+
+def _get_conn(read_only=False, path=DB_PATH):
+    """Open a database connection with per-connection performance pragmas."""
+    if read_only:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+        # Rows convert straight to dicts for JSON responses
+        conn.row_factory = sqlite3.Row
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+    # WAL (set once in setup_database) only needs a sync per checkpoint at NORMAL
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+class ClientChannel:
+    """Outbound events for one dashboard client: ordered alerts plus the latest live frame"""
+    def __init__(self, maxlen=CLIENT_QUEUE_SIZE):
+        self.events = deque(maxlen=maxlen)  # full queue drops its oldest event
+        self.latest_frame = None  # live frames: newest wins, older unsent ones are skipped
+        self.frame_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.open = True
+        # Rooms this client receives; the relay emits per sid, so this set is the only membership
+        self.rooms = {'global'}
+
+    def push(self, event, payload):
+        """Queue an event; live frames overwrite the single frame slot"""
+        if event == 'live_feed_update':
+            with self.frame_lock:
+                self.latest_frame = payload
+        else:
+            self.events.append((event, payload))
+        self.ready.set()
+
+    def drain(self):
+        """Yield queued events in order, then the latest live frame if one is pending"""
+        self.ready.clear()
+        while True:
+            try:
+                yield self.events.popleft()
+            except IndexError:
+                break
+
+        with self.frame_lock:
+            frame, self.latest_frame = self.latest_frame, None
+        if frame is not None:
+            yield 'live_feed_update', frame
+
+    def close(self):
+        """Stop the relay task for this client"""
+        self.open = False
+        self.ready.set()
+
+class DatabaseWriter:
+    """Single writer connection for one database file, with a batching commit thread"""
+    def __init__(self, path):
+        self.conn = _get_conn(path=path)
+        self.lock = threading.Lock()
+        self.queue = Queue()
+        with self.transaction() as conn:
+            # Persistent database setting: readers no longer block on writers
+            conn.execute('PRAGMA journal_mode=WAL')
+        threading.Thread(target=self._drain_writes, daemon=True).start()
+
+    @contextmanager
+    def transaction(self):
+        """Run a transaction on the shared writer connection"""
+        with self.lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def queue_write(self, statements, sync=False):
+        """Queue a request's (sql, params) statements for the batch writer, or commit now if sync"""
+        if sync:
+            self._commit_batch([statements])
+        else:
+            self.queue.put(statements)
+
+    def _drain_writes(self):
+        """Commit queued writes in batches so bursts share one transaction"""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + WRITE_BATCH_WINDOW
+            while len(batch) < WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            try:
+                self._commit_batch(batch)
+            except sqlite3.Error as e:
+                # Isolate the bad request so the rest of the batch still lands
+                print(f"⚠️  Batched write failed ({e}); retrying {len(batch)} requests individually")
+                for statements in batch:
+                    try:
+                        self._commit_batch([statements])
+                    except sqlite3.Error as e:
+                        print(f"❌ Dropped queued write: {e}")
+
+    def _commit_batch(self, batch):
+        """Run every queued statement in a single transaction, one executemany per statement"""
+        rows_by_sql = {}
+        for statements in batch:
+            for sql, params in statements:
+                rows_by_sql.setdefault(sql, []).append(params)
+
+        with self.transaction() as conn:
+            for sql, rows in rows_by_sql.items():
+                conn.executemany(sql, rows)
 
 class RescueDashboardServer:
     def __init__(self):
+        # One shared writer per database file serializes mutations; readers come from a pool
+        self.db_writer = DatabaseWriter(DB_PATH)
+        self.write_transaction = self.db_writer.transaction
+        self.queue_write = self.db_writer.queue_write
+        self.feeds_writer = DatabaseWriter(FEEDS_DB_PATH) if PERSIST_CAMERA_FRAMES else None
+        self.reader_pool = Queue(maxsize=DB_READER_POOL_SIZE)
         self.setup_database()
         self.active_missions = {}
         self.bot_status = {}
-        self.live_feeds = {}
+        # LRU of latest frame per mission; single-key get/set stay atomic under the GIL
+        self.live_feeds = OrderedDict()
+        self.client_channels = {}
+        
+        # Keep query planner statistics fresh for long-running servers
+        threading.Thread(target=self._optimize_database_loop, daemon=True).start()
         
         print("🚁 Rescue Dashboard Server Starting...")
         
     def setup_database(self):
         """Initialize SQLite database for mission data"""
-        with sqlite3.connect('rescue_missions.db') as conn:
+        with self.write_transaction() as conn:
+            conn.execute('PRAGMA mmap_size=268435456')
             cursor = conn.cursor()
 
             # Mission table
@@ -40,7 +218,7 @@ class RescueDashboardServer:
                 mission_id TEXT UNIQUE,
                 rover_name TEXT,
                 status TEXT,
-                start_time TIMESTAMP,
+                start_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
                 end_time TIMESTAMP,
                 survivor_detected BOOLEAN,
                 analysis_complete BOOLEAN,
@@ -68,15 +246,57 @@ class RescueDashboardServer:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 mission_id TEXT,
                 detection_confidence REAL,
-                medical_analysis TEXT,
+                medical_analysis BLOB,
                 injury_severity TEXT,
                 recommended_action TEXT,
                 analysis_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (mission_id) REFERENCES missions (mission_id)
             )
             ''')
+
+            # Indexes for per-mission lookups and the recent-missions list
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_mid ON mission_events (mission_id, timestamp DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_mid ON survivor_analysis (mission_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_missions_start ON missions (start_time DESC)')
+
+        if self.feeds_writer:
+            with self.feeds_writer.transaction() as conn:
+                # Persisted camera frames, pruned to FRAME_RETENTION per mission
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS frames (
+                    mission_id TEXT,
+                    ts REAL,
+                    jpeg BLOB
+                )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_frames_mid ON frames (mission_id, ts)')
         print("✅ Database initialized")
 
+    def _optimize_database_loop(self):
+        """Periodically let SQLite refresh its query planner statistics"""
+        while True:
+            time.sleep(DB_OPTIMIZE_INTERVAL)
+            try:
+                with self.write_transaction() as conn:
+                    conn.execute('PRAGMA optimize')
+            except sqlite3.Error as e:
+                print(f"⚠️  PRAGMA optimize failed: {e}")
+
+    @contextmanager
+    def read_connection(self):
+        """Borrow a read-only connection from the pool"""
+        try:
+            conn = self.reader_pool.get_nowait()
+        except Empty:
+            conn = _get_conn(read_only=True)
+        try:
+            yield conn
+        finally:
+            try:
+                self.reader_pool.put_nowait(conn)
+            except Full:
+                conn.close()
+
 dashboard_server = RescueDashboardServer()
 
 
@@ -92,6 +312,45 @@ def _error_response(message, status_code=500):
     """Create a structured API error response."""
     return jsonify({'status': 'error', 'message': message}), status_code
 
+
+def _row_to_dict(row):
+    """Convert an optional sqlite3.Row to a dict."""
+    return dict(row) if row is not None else None
+
+
+def _dumps_text(obj):
+    """Serialize an object to JSON text for TEXT columns."""
+    return orjson.dumps(obj).decode()
+
+
+def _pack(obj):
+    """Compress a JSON-serializable object for BLOB storage."""
+    return zlib.compress(orjson.dumps(obj), 1)
+
+
+def _unpack(value):
+    """Decode a packed BLOB; rows written before compression hold plain JSON text."""
+    if isinstance(value, bytes):
+        return orjson.loads(zlib.decompress(value))
+    if isinstance(value, str):
+        try:
+            return orjson.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _wants_sync_write():
+    """Callers that need durability before the response can pass ?sync=1."""
+    return request.args.get('sync') == '1'
+
+
+def _write_response(message, sync):
+    """Success response: 200 once committed, 202 while still queued."""
+    if sync:
+        return jsonify({'status': 'success', 'message': message})
+    return jsonify({'status': 'accepted', 'message': message}), 202
+
 # API Endpoints for Bot Communication
 @app.route('/api/mission/start', methods=['POST'])
 def start_mission():
@@ -104,29 +363,26 @@ def start_mission():
         if not mission_id:
             return _error_response('mission_id is required', 400)
         rover_name = data.get('rover_name', 'Unknown')
+        now_iso = datetime.now().isoformat()
 
         # Store in database
-        with sqlite3.connect('rescue_missions.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-            INSERT INTO missions (mission_id, rover_name, status, start_time, survivor_detected, analysis_complete)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (mission_id, rover_name, 'ACTIVE', datetime.now(), False, False))
+        with dashboard_server.write_transaction() as conn:
+            conn.execute(SQL_INSERT_MISSION, (mission_id, rover_name))
 
         # Update active missions
         dashboard_server.active_missions[mission_id] = {
             'rover_name': rover_name,
             'status': 'ACTIVE',
-            'start_time': datetime.now().isoformat(),
+            'start_time': now_iso,
             'survivor_detected': False
         }
 
         # Broadcast to dashboard
-        socketio.emit('mission_started', {
+        _broadcast('mission_started', {
             'mission_id': mission_id,
             'rover_name': rover_name,
             'status': 'ACTIVE',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         })
 
         print(f"🚨 Mission started: {mission_id} by {rover_name}")
@@ -148,21 +404,17 @@ def survivor_detected():
         return jsonify({'status': 'error', 'message': 'mission_id is required'}), 400
     confidence = data.get('confidence', 0.0)
     position = data.get('position', 'Unknown')
+    now_iso = datetime.now().isoformat()
     
     # Update database
-    with sqlite3.connect('rescue_missions.db') as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE missions SET survivor_detected = ? WHERE mission_id = ?
-        ''', (True, mission_id))
-
-        cursor.execute('''
-        INSERT INTO mission_events (mission_id, event_type, event_data)
-        VALUES (?, ?, ?)
-        ''', (mission_id, 'SURVIVOR_DETECTED', json.dumps({
+    sync = _wants_sync_write()
+    dashboard_server.queue_write([
+        (SQL_MARK_SURVIVOR_DETECTED, (True, mission_id)),
+        (SQL_INSERT_EVENT, (mission_id, 'SURVIVOR_DETECTED', _dumps_text({
             'confidence': confidence,
             'position': position
-        })))
+        }))),
+    ], sync=sync)
     
     # Update active missions
     if mission_id in dashboard_server.active_missions:
@@ -170,20 +422,20 @@ def survivor_detected():
         dashboard_server.active_missions[mission_id]['last_detection'] = {
             'confidence': confidence,
             'position': position,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         }
     
-    # Broadcast URGENT alert to dashboard
-    socketio.emit('survivor_alert', {
+    # Broadcast URGENT alert to every dashboard, subscribed to this mission or not
+    _broadcast('survivor_alert', {
         'mission_id': mission_id,
         'confidence': confidence,
         'position': position,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'alert_level': 'URGENT'
     })
     
     print(f"🚨 SURVIVOR DETECTED in mission {mission_id}!")
-    return jsonify({'status': 'success', 'message': 'Survivor detection recorded'})
+    return _write_response('Survivor detection recorded', sync)
 
 @app.route('/api/mission/medical_analysis', methods=['POST'])
 def medical_analysis():
@@ -195,25 +447,20 @@ def medical_analysis():
     if not mission_id:
         return jsonify({'status': 'error', 'message': 'mission_id is required'}), 400
     analysis = data.get('analysis', {})
+    now_iso = datetime.now().isoformat()
     
     # Store analysis
-    with sqlite3.connect('rescue_missions.db') as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE missions SET analysis_complete = ? WHERE mission_id = ?
-        ''', (True, mission_id))
-
-        cursor.execute('''
-        INSERT INTO survivor_analysis 
-        (mission_id, detection_confidence, medical_analysis, injury_severity, recommended_action)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (
+    sync = _wants_sync_write()
+    dashboard_server.queue_write([
+        (SQL_MARK_ANALYSIS_COMPLETE, (True, mission_id)),
+        (SQL_INSERT_ANALYSIS, (
             mission_id,
             analysis.get('confidence', 0.0),
-            json.dumps(analysis.get('medical_details', {})),
+            _pack(analysis.get('medical_details', {})),
             analysis.get('severity', 'Unknown'),
             analysis.get('recommended_action', 'Immediate rescue required')
-        ))
+        )),
+    ], sync=sync)
     
     # Update active missions
     if mission_id in dashboard_server.active_missions:
@@ -221,14 +468,14 @@ def medical_analysis():
         dashboard_server.active_missions[mission_id]['analysis_complete'] = True
     
     # Broadcast medical alert
-    socketio.emit('medical_analysis_complete', {
+    _broadcast('medical_analysis_complete', {
         'mission_id': mission_id,
         'analysis': analysis,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': now_iso
     })
     
     print(f"🏥 Medical analysis complete for mission {mission_id}")
-    return jsonify({'status': 'success', 'message': 'Medical analysis recorded'})
+    return _write_response('Medical analysis recorded', sync)
 
 @app.route('/api/mission/status', methods=['POST'])
 def update_mission_status():
@@ -241,51 +488,53 @@ def update_mission_status():
     if not mission_id or not status:
         return jsonify({'status': 'error', 'message': 'mission_id and status are required'}), 400
     details = data.get('details', '')
+    now_iso = datetime.now().isoformat()
     
     # Store event
-    with sqlite3.connect('rescue_missions.db') as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO mission_events (mission_id, event_type, event_data)
-        VALUES (?, ?, ?)
-        ''', (mission_id, 'STATUS_UPDATE', json.dumps({
+    sync = _wants_sync_write()
+    dashboard_server.queue_write([
+        (SQL_INSERT_EVENT, (mission_id, 'STATUS_UPDATE', _dumps_text({
             'status': status,
             'details': details
-        })))
+        }))),
+    ], sync=sync)
     
     # Broadcast status update
-    socketio.emit('status_update', {
+    _broadcast('status_update', {
         'mission_id': mission_id,
         'status': status,
         'details': details,
-        'timestamp': datetime.now().isoformat()
-    })
+        'timestamp': now_iso
+    }, room=mission_id)
     
-    return jsonify({'status': 'success'})
-
-@app.route('/api/camera_feed', methods=['POST'])
-def receive_camera_feed():
-    """Receive camera frames from bot"""
-    data = _get_json_payload()
-    if data is None:
-        return jsonify({'status': 'error', 'message': 'Invalid JSON payload'}), 400
-    mission_id = data.get('mission_id')
-    frame_data = data.get('frame_data')  # base64 encoded
-    if not mission_id or not frame_data:
-        return jsonify({'status': 'error', 'message': 'mission_id and frame_data are required'}), 400
+    return _write_response('Status update recorded', sync)
+
+@app.route('/api/camera_feed/<mission_id>', methods=['POST'])
+def receive_camera_feed(mission_id):
+    """Receive raw JPEG camera frames from bot"""
+    frame = request.get_data(cache=False)
+    if not frame:
+        return jsonify({'status': 'error', 'message': 'JPEG frame body is required'}), 400
+    now = datetime.now()
     
     # Store latest frame for live feed
-    dashboard_server.live_feeds[mission_id] = {
-        'frame_data': frame_data,
-        'timestamp': datetime.now().isoformat()
-    }
+    live_feeds = dashboard_server.live_feeds
+    live_feeds[mission_id] = (frame, now.timestamp())
+    live_feeds.move_to_end(mission_id)
+    while len(live_feeds) > LIVE_FEED_LIMIT:
+        live_feeds.popitem(last=False)
+    if dashboard_server.feeds_writer:
+        dashboard_server.feeds_writer.queue_write([
+            (SQL_INSERT_FRAME, (mission_id, now.timestamp(), frame)),
+            (SQL_PRUNE_FRAMES, (mission_id, now.timestamp() - FRAME_RETENTION)),
+        ])
     
-    # Broadcast to connected clients
-    socketio.emit('live_feed_update', {
+    # Broadcast to connected clients; bytes go out as a binary attachment
+    _broadcast('live_feed_update', {
         'mission_id': mission_id,
-        'frame_data': frame_data,
-        'timestamp': datetime.now().isoformat()
-    })
+        'frame': frame,
+        'timestamp': now.isoformat()
+    }, room=mission_id)
     
     return jsonify({'status': 'success'})
 
@@ -299,24 +548,12 @@ def dashboard():
 def get_missions():
     """Get all missions for dashboard"""
     try:
-        with sqlite3.connect('rescue_missions.db') as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        with dashboard_server.read_connection() as conn:
+            cursor = conn.execute('''
             SELECT mission_id, rover_name, status, start_time, survivor_detected, analysis_complete
             FROM missions ORDER BY start_time DESC LIMIT 50
             ''')
-            missions = cursor.fetchall()
-
-        mission_list = []
-        for mission in missions:
-            mission_list.append({
-                'mission_id': mission[0],
-                'rover_name': mission[1],
-                'status': mission[2],
-                'start_time': mission[3],
-                'survivor_detected': mission[4],
-                'analysis_complete': mission[5]
-            })
+            mission_list = [dict(row) for row in cursor]
 
         return jsonify(mission_list)
     except sqlite3.Error:
@@ -327,23 +564,25 @@ def get_missions():
 def get_mission_details(mission_id):
     """Get detailed information for specific mission"""
     try:
-        with sqlite3.connect('rescue_missions.db') as conn:
+        with dashboard_server.read_connection() as conn:
             cursor = conn.cursor()
 
             # Get mission info
             cursor.execute('SELECT * FROM missions WHERE mission_id = ?', (mission_id,))
-            mission = cursor.fetchone()
+            mission = _row_to_dict(cursor.fetchone())
 
             # Get events
             cursor.execute('''
             SELECT event_type, event_data, timestamp FROM mission_events 
             WHERE mission_id = ? ORDER BY timestamp DESC
             ''', (mission_id,))
-            events = cursor.fetchall()
+            events = [dict(row) for row in cursor]
 
             # Get analysis
             cursor.execute('SELECT * FROM survivor_analysis WHERE mission_id = ?', (mission_id,))
-            analysis = cursor.fetchone()
+            analysis = _row_to_dict(cursor.fetchone())
+            if analysis:
+                analysis['medical_analysis'] = _unpack(analysis['medical_analysis'])
 
         return jsonify({
             'mission': mission,
@@ -355,14 +594,42 @@ def get_mission_details(mission_id):
         return _error_response('database operation failed')
 
 # WebSocket Events for Real-time Communication
+def _broadcast(event, payload, room='global'):
+    """Queue an event for every client in room without waiting on their sockets."""
+    for channel in list(dashboard_server.client_channels.values()):
+        if room in channel.rooms:
+            channel.push(event, payload)
+
+
+def _relay_client_channel(sid, channel):
+    """Background task sending one client's queued events at its own pace."""
+    while channel.open:
+        channel.ready.wait()
+        for event, payload in channel.drain():
+            socketio.emit(event, payload, to=sid)
+
 @socketio.on('connect')
 def handle_connect():
     print('🔗 Dashboard client connected')
+    channel = ClientChannel()
+    dashboard_server.client_channels[request.sid] = channel
+    socketio.start_background_task(_relay_client_channel, request.sid, channel)
     emit('connection_status', {'status': 'connected'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('🔌 Dashboard client disconnected')
+    channel = dashboard_server.client_channels.pop(request.sid, None)
+    if channel:
+        channel.close()
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Start sending a mission's alerts and live frames to this client"""
+    mission_id = data.get('mission_id') if isinstance(data, dict) else None
+    channel = dashboard_server.client_channels.get(request.sid)
+    if mission_id and channel:
+        channel.rooms.add(mission_id)
 
 if __name__ == '__main__':
     print("🚁 Starting Rescue Dashboard Server...")
@@ -141,12 +141,11 @@ class RescueRoverSystem:
             print("⚠️  Camera system offline - attempting restart...")
             self.camera_manager.start_camera()
         
-        # Check queue health - fix the logic here
+        # Check queue health - a full queue is expected since the camera
+        # drops its oldest frame when nobody is consuming
         queue_size = camera_status['queue_size']
         if queue_size == 0 and camera_status['is_running']:
             print("⚠️  No frames in queue - camera may need restart")
-        elif queue_size > 25:
-            print("⚠️  Frame queue getting full")
     
     def _signal_handler(self, sig, frame):
         """Handle shutdown signals"""
@@ -1,20 +1,47 @@
 import cv2
+import numpy as np
 import time
 import threading
 from queue import Queue, Empty, Full
 import tempfile
 import os
-from ..config import Config
+from ..config import get_config
+from ..detection.frame_hash import perceptual_hash
+
+class FrameItem:
+    """Captured frame with its capture timestamp"""
+    __slots__ = ('frame', 'timestamp')
+    
+    def __init__(self, frame, timestamp):
+        self.frame = frame
+        self.timestamp = timestamp
 
 class CameraManager:
+    CAPTURE_FPS = 10        # frame rate delivered to consumers
+    
+    # Recording pipeline tuning
+    WRITE_PREFETCH = 8      # frames buffered between processor and writer
+    FRAME_TIMEOUT = 0.5     # seconds to wait on the capture queue per frame
+    
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
         self.camera = None
         self.is_running = False
         self.frame_queue = Queue(maxsize=30)
         self.is_recording = False
         self.capture_thread = None
         
+        # Writer backends resolved once: hardware H.264 first, software mp4v last
+        h264 = cv2.VideoWriter_fourcc(*'avc1')
+        self._writer_candidates = (
+            # FFmpeg with whatever hardware encoder the platform exposes
+            (cv2.CAP_FFMPEG, h264, [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]),
+            # Platform default backend (AVFoundation/VideoToolbox on macOS)
+            (cv2.CAP_ANY, h264, []),
+            (cv2.CAP_ANY, cv2.VideoWriter_fourcc(*'mp4v'), []),
+        )
+        self._writer_backend = None
+        
     def initialize_camera(self):
         """Initialize camera for macOS"""
         try:
@@ -41,7 +68,7 @@ class CameraManager:
             # Set camera properties
             self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Lower resolution for stability
             self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, 10)
+            self.camera.set(cv2.CAP_PROP_FPS, self.CAPTURE_FPS)
             
             # Test immediate capture
             ret, test_frame = self.camera.read()
@@ -82,6 +109,12 @@ class CameraManager:
         """Capture frames continuously - simplified version"""
         print("🎥 Frame capture thread started")
         frame_count = 0
+        grab_count = 0
+        grab_failures = 0
+        
+        # Drivers that ignore CAP_PROP_FPS deliver faster; only decode every Nth grab
+        camera_fps = self.camera.get(cv2.CAP_PROP_FPS) if self.camera else 0
+        decimate = max(1, round(camera_fps / self.CAPTURE_FPS)) if camera_fps > 0 else 1
         
         while self.is_running:
             try:
@@ -90,43 +123,45 @@ class CameraManager:
                     time.sleep(1)
                     continue
                 
-                ret, frame = self.camera.read()
+                # grab() only dequeues the driver buffer; skipped frames are never decoded
+                if not self.camera.grab():
+                    # Back off on a disconnected camera instead of spinning and flooding the log
+                    grab_failures += 1
+                    if grab_failures == 1 or grab_failures % 50 == 0:
+                        print(f"⚠️  Failed to grab frame ({grab_failures} in a row)")
+                    time.sleep(min(0.1 * grab_failures, 1.0))
+                    continue
+                if grab_failures:
+                    print(f"✅ Frame grab recovered after {grab_failures} failures")
+                    grab_failures = 0
+                
+                grab_count += 1
+                if grab_count % decimate:
+                    continue
+                
+                ret, frame = self.camera.retrieve()
                 if not ret:
-                    print("⚠️  Failed to read frame")
-                    time.sleep(0.1)
+                    print("⚠️  Failed to decode frame")
                     continue
                 
                 frame_count += 1
                 
-                # Clear queue if it's getting full
-                while self.frame_queue.qsize() >= 25:
-                    try:
-                        self.frame_queue.get_nowait()
-                    except Empty:
-                        break
-                
-                # Add new frame
+                # Hand off to consumers without ever blocking grab()
+                frame_data = FrameItem(frame, time.time())  # retrieve() allocates a fresh array per call
                 try:
-                    self.frame_queue.put_nowait({
-                        'frame': frame.copy(),  # Make a copy to avoid issues
-                        'timestamp': time.time()
-                    })
+                    self.frame_queue.put_nowait(frame_data)
                 except Full:
+                    # Nobody is consuming - drop the stalest frame to stay current
                     try:
                         self.frame_queue.get_nowait()
                     except Empty:
                         pass
-                    self.frame_queue.put_nowait({
-                        'frame': frame.copy(),
-                        'timestamp': time.time()
-                    })
+                    self.frame_queue.put_nowait(frame_data)
                 
                 # Debug output every 50 frames
                 if frame_count % 50 == 0:
                     print(f"📷 Captured {frame_count} frames, queue: {self.frame_queue.qsize()}")
                 
-                time.sleep(0.1)  # 10 FPS
-                
             except Exception as e:
                 print(f"❌ Frame capture error: {e}")
                 time.sleep(1)
@@ -134,7 +169,7 @@ class CameraManager:
         print(f"🛑 Frame capture stopped - Total frames: {frame_count}")
     
     def record_video_segment(self, duration=None):
-        """Record video segment - simplified approach"""
+        """Record a video segment; returns (video_path, scene_hash of its middle frame)"""
         if duration is None:
             duration = self.config.VIDEO_RECORDING_DURATION
         
@@ -143,21 +178,28 @@ class CameraManager:
         
         if self.is_recording:
             print("⚠️  Already recording")
-            return None
+            return None, None
+        
+        # Frames queued while nobody was recording predate this scan - skip them
+        record_start = time.time()
         
-        # Check if we have frames available
-        if self.frame_queue.qsize() == 0:
+        # Wait for a frame to determine video properties
+        frame_data = self.get_latest_frame(since=record_start)
+        if not frame_data:
             print("❌ No frames available - trying direct capture")
             # Try direct capture as fallback
             return self._direct_record_video(duration)
         
         out = None
+        writer_thread = None
+        video_path = None
+        write_queue = Queue(maxsize=self.WRITE_PREFETCH)
         try:
             # Create temp file
             temp_file = tempfile.NamedTemporaryFile(
                 suffix='.mp4',
                 delete=False,
-                dir=self.config.TEMP_VIDEO_DIR,
+                dir=self.config.VIDEO_SPOOL_DIR,
                 prefix=f'body_scan_{int(time.time())}_'
             )
             video_path = temp_file.name
@@ -165,37 +207,50 @@ class CameraManager:
             
             self.is_recording = True
             
-            # Get a frame to determine video properties
-            frame_data = self.get_latest_frame()
-            if not frame_data:
-                print("❌ No frame data available")
-                self.is_recording = False
-                return None
-            
-            frame = frame_data['frame']
-            height, width = frame.shape[:2]
-            
-            # Setup video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            fps = 10
-            out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
+            # Setup video writer at the reduced analysis resolution
+            fps = self.CAPTURE_FPS
+            out = self._open_video_writer(video_path, fps, self._analysis_size())
             
             if not out.isOpened():
                 print("❌ Failed to create video writer")
                 self.is_recording = False
-                return None
+                self._discard_video(video_path)
+                return None, None
+            
+            # Encode on a dedicated writer thread so capture keeps flowing
+            writer_stats = {'frames_written': 0}
+            writer_thread = threading.Thread(
+                target=self._write_frames,
+                args=(out, write_queue, writer_stats),
+                daemon=True
+            )
+            writer_thread.start()
+            downscale = self._analysis_downscaler(frame_data.frame)
+            put_frame = write_queue.put
+            put_frame(downscale(frame_data.frame))
+            
+            # Remember the frame nearest the clip's midpoint for scene matching
+            midpoint = record_start + duration / 2
+            mid_frame = frame_data.frame
             
-            # Record frames
-            start_time = time.time()
-            frames_written = 0
+            # Record frames: the capture queue paces us, so never sleep here
+            deadline = time.monotonic() + duration
             
-            while time.time() - start_time < duration:
-                frame_data = self.get_latest_frame()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                frame_data = self.get_latest_frame(timeout=remaining, since=record_start)
                 if frame_data:
-                    out.write(frame_data['frame'])
-                    frames_written += 1
-                
-                time.sleep(1/fps)
+                    put_frame(downscale(frame_data.frame))
+                    if frame_data.timestamp <= midpoint:
+                        mid_frame = frame_data.frame
+            
+            # Flush the writer before finalizing the container
+            write_queue.put(None)
+            writer_thread.join()
+            writer_thread = None
+            frames_written = writer_stats['frames_written']
             
             out.release()
             out = None
@@ -204,35 +259,104 @@ class CameraManager:
             if frames_written > 0:
                 file_size = os.path.getsize(video_path)
                 print(f"✅ Video recorded: {frames_written} frames, {file_size} bytes")
-                return video_path
+                return video_path, perceptual_hash(mid_frame)
             else:
                 print("❌ No frames written")
-                os.remove(video_path)
-                return None
+                self._discard_video(video_path)
+                return None, None
                 
         except Exception as e:
             print(f"❌ Recording error: {e}")
-            return None
+            self._discard_video(video_path)
+            return None, None
         finally:
             self.is_recording = False
+            if writer_thread is not None:
+                write_queue.put(None)
+                writer_thread.join()
             if out is not None:
                 out.release()
     
+    def _discard_video(self, video_path):
+        """Delete an unusable spool file with a single unlink, tolerating it being gone"""
+        if video_path is None:
+            return
+        try:
+            os.unlink(video_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️  Failed to remove spool file {video_path}: {e}")
+    
+    def _analysis_size(self):
+        """Frame size of the clips uploaded for analysis"""
+        return (self.config.ANALYSIS_WIDTH, self.config.ANALYSIS_HEIGHT)
+    
+    def _analysis_downscaler(self, sample_frame, reuse_buffer=False):
+        """Frame resizer for one recording, specialised on the first frame's shape"""
+        # A camera delivers one resolution per session, so decide once instead of per frame
+        size = self._analysis_size()
+        if sample_frame.shape[1] == size[0] and sample_frame.shape[0] == size[1]:
+            return lambda frame: frame
+        if reuse_buffer:
+            # Only for synchronous writers: VideoWriter.write copies the frame, so the next
+            # resize can overwrite the same memory
+            buffer = np.empty((size[1], size[0], 3), np.uint8)
+            return lambda frame: cv2.resize(frame, size, dst=buffer, interpolation=cv2.INTER_AREA)
+        return lambda frame: cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    
+    def _open_video_writer(self, video_path, fps, frame_size):
+        """Open a hardware-accelerated H.264 writer, falling back to software mp4v"""
+        # Try the backend that worked last time first to skip failed negotiations
+        candidates = self._writer_candidates
+        if self._writer_backend is not None:
+            candidates = (self._writer_backend,) + tuple(
+                c for c in candidates if c is not self._writer_backend
+            )
+        
+        out = None
+        for candidate in candidates:
+            api_preference, fourcc, params = candidate
+            out = cv2.VideoWriter(video_path, api_preference, fourcc, fps, frame_size, params)
+            if out.isOpened():
+                if candidate is self._writer_candidates[-1] and candidate is not self._writer_backend:
+                    print("⚠️  H.264 writer unavailable - falling back to mp4v")
+                self._writer_backend = candidate
+                return out
+            out.release()
+        
+        return out
+    
+    def _write_frames(self, out, write_queue, writer_stats):
+        """Writer stage of the recording pipeline - owns the VideoWriter until the sentinel arrives"""
+        get_frame = write_queue.get
+        write = out.write
+        while True:
+            frame = get_frame()
+            if frame is None:
+                break
+            try:
+                write(frame)
+                writer_stats['frames_written'] += 1
+            except Exception as e:
+                print(f"❌ Frame write error: {e}")
+    
     def _direct_record_video(self, duration):
         """Direct recording fallback method"""
         print("🎬 Using direct recording method...")
         
         out = None
+        video_path = None
         try:
             if not self.camera or not self.camera.isOpened():
                 print("❌ Camera not available for direct recording")
-                return None
+                return None, None
             
             # Create temp file
             temp_file = tempfile.NamedTemporaryFile(
                 suffix='.mp4',
                 delete=False,
-                dir=self.config.TEMP_VIDEO_DIR,
+                dir=self.config.VIDEO_SPOOL_DIR,
                 prefix=f'direct_scan_{int(time.time())}_'
             )
             video_path = temp_file.name
@@ -242,33 +366,37 @@ class CameraManager:
             ret, first_frame = self.camera.read()
             if not ret:
                 print("❌ Cannot capture frame for direct recording")
-                return None
-            
-            height, width = first_frame.shape[:2]
+                self._discard_video(video_path)
+                return None, None
             
-            # Setup video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            fps = 10
-            out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
+            # Setup video writer at the reduced analysis resolution
+            fps = self.CAPTURE_FPS
+            out = self._open_video_writer(video_path, fps, self._analysis_size())
             
             if not out.isOpened():
                 print("❌ Direct recording: Failed to create video writer")
-                return None
+                self._discard_video(video_path)
+                return None, None
             
             # Write first frame
-            out.write(first_frame)
+            downscale = self._analysis_downscaler(first_frame, reuse_buffer=True)
+            write = out.write
+            read = self.camera.read
+            write(downscale(first_frame))
             frames_written = 1
             
-            # Record remaining frames
-            start_time = time.time()
+            # Record remaining frames - read() blocks at the camera's frame rate
+            deadline = time.monotonic() + duration
+            midpoint = deadline - duration / 2
+            mid_frame = first_frame
             
-            while time.time() - start_time < duration:
-                ret, frame = self.camera.read()
+            while time.monotonic() < deadline:
+                ret, frame = read()
                 if ret:
-                    out.write(frame)
+                    write(downscale(frame))
                     frames_written += 1
-                
-                time.sleep(1/fps)
+                    if time.monotonic() <= midpoint:
+                        mid_frame = frame
             
             out.release()
             out = None
@@ -276,24 +404,31 @@ class CameraManager:
             if frames_written > 0:
                 file_size = os.path.getsize(video_path)
                 print(f"✅ Direct recording successful: {frames_written} frames, {file_size} bytes")
-                return video_path
+                return video_path, perceptual_hash(mid_frame)
             else:
-                os.remove(video_path)
-                return None
+                self._discard_video(video_path)
+                return None, None
                 
         except Exception as e:
             print(f"❌ Direct recording error: {e}")
-            return None
+            self._discard_video(video_path)
+            return None, None
         finally:
             if out is not None:
                 out.release()
     
-    def get_latest_frame(self):
-        """Get latest frame from queue"""
-        try:
-            return self.frame_queue.get_nowait()
-        except Empty:
-            return None
+    def get_latest_frame(self, timeout=None, since=None):
+        """Get the next queued frame, blocking up to timeout seconds; frames older than `since` are skipped"""
+        if timeout is None:
+            timeout = self.FRAME_TIMEOUT
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                frame_data = self.frame_queue.get(timeout=max(0, deadline - time.monotonic()))
+            except Empty:
+                return None
+            if since is None or frame_data.timestamp >= since:
+                return frame_data
     
     def stop_camera(self):
         """Stop camera"""
@@ -1,15 +1,43 @@
 import os
+import re
 import time
 import json
 import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import cv2
 from twelvelabs import TwelveLabs
-from ..config import Config
+from ..config import get_config
 from ..rescue.rescue_protocol import RescueProtocol
+from .frame_hash import perceptual_hash, hamming_distance
+
+# Words in a free-text Pegasus response that indicate a person is in view
+PERSON_KEYWORDS = frozenset({"person", "human", "people", "individual", "body", "someone"})
+_PERSON_KEYWORDS_RE = re.compile(
+    r"\b(?:" + "|".join(sorted(PERSON_KEYWORDS)) + r")\b", re.IGNORECASE
+)
+# Outermost {...} block, tolerating markdown fences or prose around it
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+def _count_person_keywords(text):
+    """Tally every whole-word person keyword in a single pass over the text"""
+    counts = dict.fromkeys(PERSON_KEYWORDS, 0)
+    for match in _PERSON_KEYWORDS_RE.finditer(text):
+        counts[match.group().lower()] += 1
+    return counts
 
 class BodyDetectionSystem:
+    # TwelveLabs task polling back-off (seconds)
+    TASK_POLL_INITIAL = 1.0
+    TASK_POLL_MAX = 5.0
+    
+    # Motion gate: frames this far apart (seconds), pixels changing by more than this
+    MOTION_SAMPLE_GAP = 0.5
+    MOTION_PIXEL_DELTA = 25
+    
     def __init__(self, camera_manager):
-        self.config = Config()
+        self.config = get_config()
         self.camera_manager = camera_manager
         self.rescue_protocol = RescueProtocol()
         
@@ -23,6 +51,21 @@ class BodyDetectionSystem:
         self.total_scans = 0
         self.survivors_found = 0
         self.last_scan_time = 0
+        self._stats_lock = threading.Lock()
+        self.last_motion_score = None
+        # Scene hash of the last clip sent for analysis; static scans must match it to be skipped
+        self._last_analyzed_hash = None
+        
+        # Scene hash -> (response_text, video_id) for recently analyzed scenes
+        self._analysis_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Uploads/analyses of recent scans overlap with recording of the next one;
+        # the executor is created per run in start_detection_system
+        self._analysis_executor = None
+        self._pending_scans = set()
+        # Wakes the detection loop's waits as soon as stop is requested
+        self._stop_requested = threading.Event()
         
         # Rescue detection prompts for Pegasus
         self.rescue_analysis_prompt = """
@@ -61,7 +104,16 @@ class BodyDetectionSystem:
         self._initialize_detection_index()
     
     def _initialize_detection_index(self):
-        """Initialize TwelveLabs index for video analysis"""
+        """Reuse the cached TwelveLabs index for this rover, creating one if needed"""
+        cached_index_id = self._load_cached_index_id()
+        if cached_index_id:
+            try:
+                self.index = self.client.index.retrieve(cached_index_id)
+                print(f"♻️  Reusing detection index: {self.index.id}")
+                return
+            except Exception as e:
+                print(f"⚠️  Cached index {cached_index_id} unavailable ({e}) - creating a new one")
+        
         try:
             print("📋 Creating TwelveLabs index...")
             index_name = f"{self.config.ROVER_NAME}_pegasus_rescue_{int(time.time())}"
@@ -81,6 +133,32 @@ class BodyDetectionSystem:
         except Exception as e:
             print(f"❌ Failed to create detection index: {e}")
             raise
+        
+        self._save_cached_index_id(self.index.id)
+    
+    def _load_cached_index_id(self):
+        """Return the index id persisted by a previous run of this rover, if any"""
+        try:
+            with open(self.config.INDEX_STATE_FILE) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if not isinstance(state, dict) or state.get("rover_name") != self.config.ROVER_NAME:
+            return None
+        return state.get("index_id")
+    
+    def _save_cached_index_id(self, index_id):
+        """Persist the index id atomically so restarts can reuse it"""
+        state_file = self.config.INDEX_STATE_FILE
+        tmp_file = f"{state_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(state_file), exist_ok=True)
+            with open(tmp_file, 'w') as f:
+                json.dump({"rover_name": self.config.ROVER_NAME, "index_id": index_id}, f)
+            os.replace(tmp_file, state_file)
+        except OSError as e:
+            print(f"⚠️  Failed to cache detection index id: {e}")
     
     def start_detection_system(self):
         """Start the body detection system"""
@@ -90,6 +168,11 @@ class BodyDetectionSystem:
         print(f"   Using: Pegasus 1.2 model")
         
         self.is_detecting = True
+        self._stop_requested.clear()
+        self._analysis_executor = ThreadPoolExecutor(
+            max_workers=self.config.MAX_CONCURRENT_UPLOADS,
+            thread_name_prefix="pegasus_scan"
+        )
         
         # Start detection thread
         self.detection_thread = threading.Thread(target=self._detection_loop, daemon=True)
@@ -107,39 +190,132 @@ class BodyDetectionSystem:
                 print(f"\n🔍 Starting detection scan #{scan_number}")
                 
                 # Add small delay for camera stability
-                time.sleep(1)
+                if self._stop_requested.wait(1):
+                    break
                 
                 # Perform detection scan
                 self.perform_detection_scan()
                 
                 # Wait for next scan
-                time.sleep(self.config.DETECTION_INTERVAL)
+                self._stop_requested.wait(self.config.DETECTION_INTERVAL)
                 
             except Exception as e:
                 print(f"❌ Error in detection loop: {e}")
-                time.sleep(5)
+                self._stop_requested.wait(5)
     
     def perform_detection_scan(self):
         """Perform a single detection scan using Pegasus"""
         try:
-            self.total_scans += 1
-            self.last_scan_time = time.time()
+            with self._stats_lock:
+                self.total_scans += 1
+                scan_number = self.total_scans
+                self.last_scan_time = time.time()
+            
+            # Skip only when nothing moves AND the view is the one the last analyzed scan saw
+            motion_score, current_frame = self._measure_scene_motion()
+            with self._stats_lock:
+                self.last_motion_score = motion_score
+            if (motion_score is not None and motion_score < self.config.MOTION_THRESHOLD
+                    and self._matches_last_analyzed_scene(current_frame)):
+                print(f"💤 Scene static (motion {motion_score:.4f}) and unchanged since last scan - skipping")
+                return
             
             # Record video segment
             print("📹 Recording video for analysis...")
-            video_path = self.camera_manager.record_video_segment()
+            video_path, scene_hash = self.camera_manager.record_video_segment()
             
             if not video_path:
                 print("❌ Failed to record video segment")
                 return
+            if not self.is_detecting:
+                print("🛑 Detection stopping - discarding recorded clip")
+                self._remove_temp_video(video_path)
+                return
+            self._last_analyzed_hash = scene_hash
+            
+            # Wait for a free upload slot, draining whichever scan finishes first
+            while len(self._pending_scans) >= self.config.MAX_CONCURRENT_UPLOADS:
+                _, self._pending_scans = wait(self._pending_scans, return_when=FIRST_COMPLETED)
+            
+            # Analyze in the background so the next recording can start
+            try:
+                future = self._analysis_executor.submit(self._analyze_scan, video_path, scene_hash, scan_number)
+            except RuntimeError as e:
+                print(f"❌ Could not queue scan analysis: {e}")
+                self._remove_temp_video(video_path)
+                return
+            self._pending_scans.add(future)
+            
+        except Exception as e:
+            print(f"❌ Error in detection scan: {e}")
+    
+    def _measure_scene_motion(self):
+        """Return (fraction of pixels changed over MOTION_SAMPLE_GAP, latest frame), or (None, None)"""
+        # Frames queued before this scan say nothing about the current view
+        first = self.camera_manager.get_latest_frame(since=time.time())
+        if first is None:
+            return None, None
+        
+        second = first
+        while second.timestamp - first.timestamp < self.MOTION_SAMPLE_GAP:
+            second = self.camera_manager.get_latest_frame()
+            if second is None:
+                return None, None
+        
+        gray_first = cv2.cvtColor(first.frame, cv2.COLOR_BGR2GRAY)
+        gray_second = cv2.cvtColor(second.frame, cv2.COLOR_BGR2GRAY)
+        diff = cv2.absdiff(gray_first, gray_second)
+        return float((diff > self.MOTION_PIXEL_DELTA).mean()), second.frame
+    
+    def _matches_last_analyzed_scene(self, frame):
+        """True if frame shows the same scene as the last clip sent for analysis"""
+        if frame is None or self._last_analyzed_hash is None:
+            return False
+        distance = hamming_distance(perceptual_hash(frame), self._last_analyzed_hash)
+        return distance <= self.config.SCENE_HASH_DISTANCE
+    
+    def _analyze_scan(self, video_path, scene_hash, scan_number):
+        """Analyze a recorded clip, reusing cached results for unchanged scenes"""
+        try:
+            # Skip the Pegasus round-trip when the scene matches a recent scan
+            cached = self._lookup_cached_analysis(scene_hash)
+            if cached:
+                print("♻️  Scene unchanged - reusing previous Pegasus analysis")
+                self._remove_temp_video(video_path)
+                self._process_pegasus_response(*cached, scan_number)
+                return
             
             # Upload and analyze with Pegasus
-            self._analyze_video_with_pegasus(video_path)
+            self._analyze_video_with_pegasus(video_path, scene_hash, scan_number)
             
         except Exception as e:
             print(f"❌ Error in detection scan: {e}")
     
-    def _analyze_video_with_pegasus(self, video_path):
+    def _lookup_cached_analysis(self, scene_hash):
+        """Return a cached analysis for a near-identical scene, if any"""
+        if scene_hash is None:
+            return None
+        
+        max_distance = self.config.SCENE_HASH_DISTANCE
+        with self._cache_lock:
+            for cached_hash, cached in self._analysis_cache.items():
+                if hamming_distance(scene_hash, cached_hash) <= max_distance:
+                    self._analysis_cache.move_to_end(cached_hash)
+                    return cached
+        return None
+    
+    def _remember_analysis(self, scene_hash, response_text, video_id):
+        """Store an analysis in the LRU scene cache"""
+        if scene_hash is None:
+            return
+        
+        with self._cache_lock:
+            self._analysis_cache[scene_hash] = (response_text, video_id)
+            self._analysis_cache.move_to_end(scene_hash)
+            while len(self._analysis_cache) > self.config.SCENE_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+    
+    def _analyze_video_with_pegasus(self, video_path, scene_hash=None, scan_number=None):
         """Analyze video using Pegasus model"""
         try:
             print("📤 Uploading video to TwelveLabs...")
@@ -154,12 +330,7 @@ class BodyDetectionSystem:
             print("⏳ Processing video...")
             
             # Wait for processing to complete
-            def print_status(task_obj):  # Accept the task object parameter
-                status = task_obj.status
-                print(f"   Status: {status}")
-                return status
-
-            task.wait_for_done(sleep_interval=2, callback=print_status)
+            task = self._wait_for_task(task.id)
             
             if task.status != "ready":
                 print(f"❌ Video processing failed: {task.status}")
@@ -176,22 +347,42 @@ class BodyDetectionSystem:
             )
             
             # Parse the response
-            self._process_pegasus_response(response.data, task.video_id)
+            self._remember_analysis(scene_hash, response.data, task.video_id)
+            self._process_pegasus_response(response.data, task.video_id, scan_number)
             
         except Exception as e:
             print(f"❌ Error analyzing video: {e}")
         
         finally:
-            # Clean up temporary video file
-            try:
-                os.remove(video_path)
-                print("🗑️  Temporary video file cleaned up")
-            except FileNotFoundError:
-                print("⚠️  Temporary video file already removed")
-            except OSError as cleanup_error:
-                print(f"⚠️  Failed to remove temporary video file: {cleanup_error}")
+            self._remove_temp_video(video_path)
+    
+    def _remove_temp_video(self, video_path):
+        """Clean up temporary video file"""
+        try:
+            os.remove(video_path)
+            print("🗑️  Temporary video file cleaned up")
+        except FileNotFoundError:
+            print("⚠️  Temporary video file already removed")
+        except OSError as cleanup_error:
+            print(f"⚠️  Failed to remove temporary video file: {cleanup_error}")
     
-    def _process_pegasus_response(self, response_text, video_id):
+    def _wait_for_task(self, task_id):
+        """Poll a TwelveLabs task with adaptive back-off until it finishes"""
+        interval = self.TASK_POLL_INITIAL
+        last_status = None
+        
+        while True:
+            task = self.client.task.retrieve(task_id)
+            if task.status != last_status:
+                print(f"   Status: {task.status}")
+                last_status = task.status
+            if task.status in ("ready", "failed"):
+                return task
+            
+            time.sleep(interval)
+            interval = min(interval * 1.5, self.TASK_POLL_MAX)
+    
+    def _process_pegasus_response(self, response_text, video_id, scan_number=None):
         """Process Pegasus analysis response"""
         try:
             print("📊 Processing AI analysis...")
@@ -200,24 +391,22 @@ class BodyDetectionSystem:
             # Try to parse JSON response
             try:
                 # Extract first JSON object from response if it contains extra text
-                clean_text = response_text.replace("```json", "").replace("```", "").strip()
-                json_start = clean_text.find("{")
-                json_end = clean_text.rfind("}")
-                if json_start != -1 and json_end > json_start:
-                    analysis = json.loads(clean_text[json_start:json_end + 1])
+                json_match = _JSON_RE.search(response_text)
+                if json_match:
+                    analysis = json.loads(json_match.group())
                 else:
                     # If no JSON found, create a basic analysis
+                    keyword_counts = _count_person_keywords(response_text)
                     analysis = {
-                        "survivors_detected": "person" in response_text.lower() or "human" in response_text.lower(),
-                        "survivor_count": response_text.lower().count("person"),
+                        "survivors_detected": keyword_counts["person"] > 0 or keyword_counts["human"] > 0,
+                        "survivor_count": keyword_counts["person"],
                         "detailed_description": response_text,
-                        "rescue_priority": "medium" if "person" in response_text.lower() else "none"
+                        "rescue_priority": "medium" if keyword_counts["person"] > 0 else "none"
                     }
             except json.JSONDecodeError:
                 # Fallback analysis based on keywords
-                text_lower = response_text.lower()
-                person_detected = any(keyword in text_lower for keyword in 
-                    ["person", "human", "people", "individual", "body", "someone"])
+                keyword_counts = _count_person_keywords(response_text)
+                person_detected = any(keyword_counts.values())
                 
                 analysis = {
                     "survivors_detected": person_detected,
@@ -229,7 +418,8 @@ class BodyDetectionSystem:
             # Process detection results
             if analysis.get("survivors_detected", False):
                 survivor_count = analysis.get("survivor_count", 1)
-                self.survivors_found += survivor_count
+                with self._stats_lock:
+                    self.survivors_found += survivor_count
                 
                 print(f"\n🚨 SURVIVORS DETECTED: {survivor_count} found!")
                 print(f"📝 Description: {analysis.get('detailed_description', 'No description')}")
@@ -254,7 +444,7 @@ class BodyDetectionSystem:
                     'analysis': analysis,
                     'video_id': video_id,
                     'detection_time': datetime.now().isoformat(),
-                    'scan_number': self.total_scans
+                    'scan_number': scan_number
                 })
                 
             else:
@@ -270,23 +460,35 @@ class BodyDetectionSystem:
         print("🛑 Stopping body detection system...")
         
         self.is_detecting = False
+        self._stop_requested.set()
         
+        # The loop may be mid-recording; it must be done with _pending_scans before we drain it
         if self.detection_thread and self.detection_thread.is_alive():
-            self.detection_thread.join(timeout=5)
+            self.detection_thread.join()
         
+        # Let in-flight scans finish before reporting statistics
+        wait(self._pending_scans)
+        self._pending_scans = set()
+        if self._analysis_executor is not None:
+            self._analysis_executor.shutdown(wait=True)
+            self._analysis_executor = None
+        
+        status = self.get_detection_status()
         print("\n📊 DETECTION STATISTICS:")
-        print(f"   Total scans performed: {self.total_scans}")
-        print(f"   Survivors found: {self.survivors_found}")
-        print(f"   Detection rate: {(self.survivors_found/max(self.total_scans, 1)):.2f} per scan")
+        print(f"   Total scans performed: {status['total_scans']}")
+        print(f"   Survivors found: {status['survivors_found']}")
+        print(f"   Detection rate: {(status['survivors_found']/max(status['total_scans'], 1)):.2f} per scan")
         
         print("✅ Body detection system stopped")
     
     def get_detection_status(self):
-        """Get detection system status"""
-        return {
-            'is_detecting': self.is_detecting,
-            'total_scans': self.total_scans,
-            'survivors_found': self.survivors_found,
-            'last_scan_time': self.last_scan_time,
-            'index_id': self.index.id if self.index else None
-        }
+        """Get a consistent snapshot of the detection system status"""
+        with self._stats_lock:
+            return {
+                'is_detecting': self.is_detecting,
+                'total_scans': self.total_scans,
+                'survivors_found': self.survivors_found,
+                'last_scan_time': self.last_scan_time,
+                'last_motion_score': self.last_motion_score,
+                'index_id': self.index.id if self.index else None
+            }
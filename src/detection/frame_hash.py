@@ -0,0 +1,18 @@
+import cv2
+import numpy as np
+
+def perceptual_hash(frame):
+    """Compute a 64-bit DCT perceptual hash of a BGR frame"""
+    # Shrink first so the color conversion touches 1k pixels instead of the full frame
+    small = cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    
+    # Keep the low-frequency 8x8 corner and threshold it against its median
+    low_freq = cv2.dct(np.float32(small))[:8, :8]
+    bits = low_freq > np.median(low_freq)
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two perceptual hashes"""
+    return (hash_a ^ hash_b).bit_count()
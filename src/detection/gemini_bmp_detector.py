@@ -1,30 +1,176 @@
 import cv2
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import numpy as np
 import google.generativeai as genai
-from io import BytesIO
-import base64
-from PIL import Image
 import threading
+import asyncio
 import os
+import heapq
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+from collections import OrderedDict
 from datetime import datetime
-from ..config import Config
+from pathlib import Path
+from ..config import get_config
+from .frame_hash import perceptual_hash, hamming_distance
+
+try:
+    import orjson
+
+    def _json_loads(text):
+        return orjson.loads(text.encode())
+except ImportError:
+    import json
+
+    def _json_loads(text):
+        return json.loads(text)
+
+
+# Survivor detection task, bound once to the model as its system instruction
+DETECTION_PROMPT = """
+Analyze camera feed images for SURVIVOR DETECTION and POSITIONING:
+
+Your task, for each image:
+1. Look for any PERSON, HUMAN, or SURVIVOR in the image
+2. If a person is detected, determine if they are CENTERED in the frame
+3. A person is considered CENTERED if they are in the middle 40% of the image
+
+Describe each image with ONLY this JSON format:
+{
+    "person_detected": true/false,
+    "person_centered": true/false,
+    "confidence": 0.0-1.0,
+    "position_description": "brief description of where person is located",
+    "target_ready": true/false
+}
+
+Set "target_ready" to true ONLY if:
+- A person is clearly detected AND
+- The person is reasonably centered in the frame AND
+- You have high confidence in the detection
+
+Be precise and conservative - false positives could cause mission failure.
+"""
+
+SINGLE_FRAME_PROMPT = "Analyze this image. Respond with ONLY the JSON object."
+
+BATCH_PROMPT = (
+    "Analyze these {count} sequential images (oldest first). Use the earlier images as context, "
+    "but judge each image on its own content. Respond with ONLY a JSON array containing one "
+    "object per image, in the same order."
+)
+
+logger = logging.getLogger("gemini_bmp")
+
+
+def _configure_logger(level):
+    """Send detector logs through a background listener so console I/O never stalls the loop"""
+    logger.setLevel(level)
+    if logger.handlers:
+        return
+    
+    log_queue = SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, console)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def _extract_json_block(text, openers='{[', pos=0):
+    """Return (block, start) for the first balanced object/array at or after pos, ignoring brackets inside strings"""
+    start = None
+    depth = 0
+    in_string = False
+    escaped = False
+    
+    for i in range(pos, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif start is None:
+            if ch in openers:
+                start = i
+                depth = 1
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1], start
+    
+    return None
+
+
+def _load_json_reply(text, openers='{['):
+    """Decode the first bracketed span that parses as JSON, falling back to the fence-stripped reply"""
+    pos = 0
+    while True:
+        found = _extract_json_block(text, openers, pos)
+        if found is None:
+            break
+        block, start = found
+        try:
+            return _json_loads(block)
+        except ValueError:
+            # Prose like "[note]" can precede the real payload - resume after this opener
+            pos = start + 1
+    
+    return _json_loads(_strip_code_fence(text))
+
+
+def _strip_code_fence(text):
+    """Remove a surrounding markdown code fence from a model response"""
+    text = text.strip().removeprefix('```json').removeprefix('```')
+    return text.removesuffix('```').strip()
 
 class GeminiBmpDetector:
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
+        _configure_logger(self.config.DETECTION_LOG_LEVEL)
         self.setup_gemini()
         self.setup_directories()
         self.running = False
         self.detection_thread = None
+        # Event loop driving the capture and analysis coroutines on detection_thread;
+        # started once and reused, since the Gemini async client binds to the loop it first runs on
+        self.loop = None
+        self._detection_future = None
+        self._stop_event = None
+        self.http = self._create_http_session()
+        # Recent Gemini results keyed by perceptual hash, oldest first
+        self._result_cache = OrderedDict()
         self.target_locked = False
+        # Encoded frames waiting for Gemini; created per run in start_detection
+        self.frame_queue = None
+        self.cap = None
+        self.cap_lock = threading.Lock()
+        self._capture_buffer = None
+        # Gemini-sized resize target reused by the capture loop (see _capture_item)
+        self._encode_buffer = None
+        # Frame archiving happens off the detection hot path
+        self.save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bmp_save")
         
     def setup_gemini(self):
         """Initialize Gemini API"""
         try:
             genai.configure(api_key=self.config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=DETECTION_PROMPT)
             print("✅ Gemini API initialized successfully")
         except Exception as e:
             print(f"❌ Gemini API setup failed: {e}")
@@ -32,92 +178,131 @@ class GeminiBmpDetector:
     
     def setup_directories(self):
         """Create organized directory structure"""
-        self.gemini_frames_dir = "gemini_frames"
-        self.temp_files_dir = "temp_files"
+        self.gemini_frames_dir = Path("gemini_frames")
+        self.temp_files_dir = Path("temp_files")
         
         # Create directories if they don't exist
-        os.makedirs(self.gemini_frames_dir, exist_ok=True)
-        os.makedirs(self.temp_files_dir, exist_ok=True)
+        self.gemini_frames_dir.mkdir(exist_ok=True)
+        self.temp_files_dir.mkdir(exist_ok=True)
         
         print(f"📁 Gemini frames directory: {self.gemini_frames_dir}/")
         print(f"📁 Temp files directory: {self.temp_files_dir}/")
     
+    def setup_camera(self):
+        """Open the camera once and keep it open for the whole detection run"""
+        with self.cap_lock:
+            if self.cap is not None and self.cap.isOpened():
+                return True
+            
+            # Use same camera as TwelveLabs system
+            self.cap = cv2.VideoCapture(self.config.BODY_CAMERA_ID)
+            if not self.cap.isOpened():
+                self.cap.release()
+                self.cap = None
+                return False
+            
+            # Set camera properties for consistency with TwelveLabs
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Keep the driver buffer shallow so every read is a fresh frame
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
+            # Reused by the capture loop so each read decodes into the same memory
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
+            self._capture_buffer = np.empty((height, width, 3), np.uint8)
+            return True
+    
+    def release_camera(self):
+        """Release the persistent camera handle"""
+        with self.cap_lock:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+    
+    def read_frame(self, buffer=None):
+        """Read a frame from the persistent camera handle, optionally into a preallocated buffer"""
+        with self.cap_lock:
+            if self.cap is None:
+                return False, None
+            return self.cap.read(buffer)
+    
     def cleanup_old_files(self, keep_last=10):
         """Clean up old detection frames, keep only recent ones"""
         try:
-            files = []
-            for f in os.listdir(self.gemini_frames_dir):
-                if f.startswith('detection_frame_') and f.endswith('.bmp'):
-                    filepath = os.path.join(self.gemini_frames_dir, f)
-                    files.append((filepath, os.path.getctime(filepath)))
-            
-            # Sort by creation time, newest first
-            files.sort(key=lambda x: x[1], reverse=True)
+            with os.scandir(self.gemini_frames_dir) as entries:
+                files = [(e.name, e.stat().st_ctime) for e in entries
+                         if e.name.startswith('detection_frame_') and e.name.endswith('.jpg') and e.is_file()]
             
-            # Remove old files, keep only recent ones
+            # Remove old files, keep only the newest by creation time
             if len(files) > keep_last:
-                for filepath, _ in files[keep_last:]:
+                keep = {name for name, _ in heapq.nlargest(keep_last, files, key=lambda x: x[1])}
+                for name, _ in files:
+                    if name in keep:
+                        continue
                     try:
-                        os.remove(filepath)
-                        print(f"🗑️  Cleaned up old file: {os.path.basename(filepath)}")
-                    except Exception as e:
-                        print(f"⚠️  Could not remove {filepath}: {e}")
+                        (self.gemini_frames_dir / name).unlink(missing_ok=True)
+                        logger.debug("🗑️  Cleaned up old file: %s", name)
+                    except OSError as e:
+                        logger.warning("⚠️  Could not remove %s: %s", name, e)
                         
         except Exception as e:
-            print(f"⚠️  Cleanup error: {e}")
+            logger.warning("⚠️  Cleanup error: %s", e)
     
     def capture_and_save_bmp(self, frame_number):
-        """Capture frame from camera and save as organized BMP"""
+        """Capture frame from camera, optionally archiving it as JPEG in the background
+        
+        Returns (frame, filepath); the frame is analyzed in memory. filepath is
+        None unless SAVE_DEBUG_FRAMES is enabled.
+        """
         try:
-            # Use same camera as TwelveLabs system
-            cap = cv2.VideoCapture(self.config.BODY_CAMERA_ID)
-            
-            if not cap.isOpened():
-                print(f"❌ Cannot open camera {self.config.BODY_CAMERA_ID}")
-                return None
-            
-            # Set camera properties for consistency with TwelveLabs
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            
-            # Capture frame
-            ret, frame = cap.read()
-            cap.release()
+            # Capture frame into the reusable buffer; it is overwritten on the next call
+            ret, frame = self.read_frame(self._capture_buffer)
             
             if ret and frame is not None:
+                if frame is not self._capture_buffer:
+                    # Driver changed resolution; adopt the new array as the buffer
+                    self._capture_buffer = frame
+                
+                if not self.config.SAVE_DEBUG_FRAMES:
+                    return frame, None
+                
                 # Create organized filename with timestamp
                 timestamp = datetime.now().strftime("%H%M%S")
-                filename = f"detection_frame_{frame_number:03d}_{timestamp}.bmp"
-                filepath = os.path.join(self.gemini_frames_dir, filename)
+                filename = f"detection_frame_{frame_number:03d}_{timestamp}.jpg"
+                filepath = self.gemini_frames_dir / filename
                 
-                # Save as BMP file in organized folder (NOT root)
-                cv2.imwrite(filepath, frame)
-                print(f"💾 BMP saved: {filename}")
-                return filepath
+                # Save as JPEG file in organized folder (NOT root)
+                # The write is asynchronous, so hand it a copy the next read can't clobber
+                self.save_executor.submit(self._write_frame_file, filepath, frame.copy())
+                return frame, filepath
             else:
-                print("❌ Failed to capture frame from camera")
-                return None
+                logger.warning("❌ Failed to capture frame from camera")
+                return None, None
                 
         except Exception as e:
-            print(f"❌ Error capturing and saving BMP: {e}")
-            return None
+            logger.error("❌ Error capturing frame: %s", e)
+            return None, None
+    
+    def _write_frame_file(self, filepath, frame):
+        """Write an archived detection frame to disk"""
+        try:
+            cv2.imwrite(str(filepath), frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85, int(cv2.IMWRITE_JPEG_OPTIMIZE), 1])
+            logger.debug("💾 Frame saved: %s", filepath.name)
+        except Exception as e:
+            logger.error("❌ Error saving frame %s: %s", filepath, e)
     
     def save_target_frame(self, frame_number):
         """Save the target acquisition frame with special naming"""
         try:
-            cap = cv2.VideoCapture(self.config.BODY_CAMERA_ID)
-            if not cap.isOpened():
-                return None
-            
-            ret, frame = cap.read()
-            cap.release()
+            ret, frame = self.read_frame()
             
             if ret and frame is not None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"TARGET_LOCKED_{frame_number:03d}_{timestamp}.bmp"
-                filepath = os.path.join(self.gemini_frames_dir, filename)
+                filepath = self.gemini_frames_dir / filename
                 
-                cv2.imwrite(filepath, frame)
+                cv2.imwrite(str(filepath), frame)
                 print(f"🎯 Target frame saved: {filename}")
                 return filepath
             
@@ -139,101 +324,140 @@ class GeminiBmpDetector:
             print(f"❌ Error loading BMP {bmp_path}: {e}")
             return None
     
-    def bmp_to_base64(self, frame):
-        """Convert BMP frame to base64 for Gemini"""
+    def encode_jpeg(self, frame, resize_buffer=None):
+        """Encode a BGR frame as JPEG bytes for Gemini, optionally resizing into resize_buffer"""
         try:
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image
-            pil_image = Image.fromarray(rgb_frame)
-            
-            # Convert to base64 JPEG
-            buffer = BytesIO()
-            pil_image.save(buffer, format='JPEG', quality=85)
-            img_bytes = buffer.getvalue()
+            # Gemini resizes to its own token grid, so don't ship extra pixels
+            size = self.config.GEMINI_INPUT_SIZE
+            small = cv2.resize(frame, (size, size), dst=resize_buffer, interpolation=cv2.INTER_AREA)
+            
+            # Encode straight from BGR - OpenCV's libjpeg needs no RGB copy
+            ok, buffer = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            if not ok:
+                logger.error("❌ JPEG encoding failed")
+                return None
             
-            return base64.b64encode(img_bytes).decode('utf-8')
+            return buffer.tobytes()
             
         except Exception as e:
-            print(f"❌ Error converting BMP frame: {e}")
+            logger.error("❌ Error converting BMP frame: %s", e)
             return None
     
     def analyze_bmp_with_gemini(self, bmp_path):
         """Analyze BMP file with Gemini for survivor detection"""
+        frame = self.load_bmp_file(bmp_path)
+        if frame is None:
+            return None
+        return self.analyze_frame(frame)
+    
+    def analyze_frame(self, frame):
+        """Analyze an in-memory BGR frame with Gemini for survivor detection"""
+        # Convert frame for Gemini
+        jpeg_bytes = self.encode_jpeg(frame)
+        if not jpeg_bytes:
+            return None
+        return self.analyze_jpeg(jpeg_bytes)
+    
+    def analyze_jpeg(self, jpeg_bytes):
+        """Analyze an encoded JPEG with Gemini for survivor detection"""
         try:
-            # Load BMP file
-            frame = self.load_bmp_file(bmp_path)
-            if frame is None:
-                return None
-            
-            # Convert frame for Gemini
-            base64_image = self.bmp_to_base64(frame)
-            if not base64_image:
-                return None
-            
-            # Create prompt for survivor detection and centering
-            prompt = """
-            Analyze this camera feed image for SURVIVOR DETECTION and POSITIONING:
-            
-            Your task:
-            1. Look for any PERSON, HUMAN, or SURVIVOR in the image
-            2. If a person is detected, determine if they are CENTERED in the frame
-            3. A person is considered CENTERED if they are in the middle 40% of the image
-            
-            Respond with ONLY this JSON format:
-            {
-                "person_detected": true/false,
-                "person_centered": true/false,
-                "confidence": 0.0-1.0,
-                "position_description": "brief description of where person is located",
-                "target_ready": true/false
-            }
-            
-            Set "target_ready" to true ONLY if:
-            - A person is clearly detected AND
-            - The person is reasonably centered in the frame AND  
-            - You have high confidence in the detection
-            
-            Be precise and conservative - false positives could cause mission failure.
-            """
-            
-            # Send to Gemini
+            # Send to Gemini; the task description lives in the model's system instruction
             response = self.model.generate_content([
-                prompt,
-                {"mime_type": "image/jpeg", "data": base64_image}
+                SINGLE_FRAME_PROMPT,
+                {"mime_type": "image/jpeg", "data": jpeg_bytes}
             ])
             
             return response.text.strip()
             
         except Exception as e:
-            print(f"❌ Gemini analysis error: {e}")
+            logger.error("❌ Gemini analysis error: %s", e)
             return None
     
+    async def analyze_jpeg_batch(self, jpeg_batch):
+        """Analyze several sequential JPEGs with Gemini in a single non-blocking request"""
+        if len(jpeg_batch) == 1:
+            prompt = SINGLE_FRAME_PROMPT
+        else:
+            prompt = BATCH_PROMPT.format(count=len(jpeg_batch))
+        
+        try:
+            # Send all frames to Gemini in one request
+            contents = [prompt]
+            contents.extend({"mime_type": "image/jpeg", "data": jpeg_bytes} for jpeg_bytes in jpeg_batch)
+            response = await self.model.generate_content_async(contents)
+            
+            return response.text.strip()
+            
+        except Exception as e:
+            logger.error("❌ Gemini batch analysis error: %s", e)
+            return None
+    
+    def _lookup_cached_result(self, frame_hash):
+        """Return the cached result for a near-identical frame, if any"""
+        max_distance = self.config.SCENE_HASH_DISTANCE
+        for cached_hash, cached in self._result_cache.items():
+            if hamming_distance(frame_hash, cached_hash) <= max_distance:
+                self._result_cache.move_to_end(cached_hash)
+                return cached
+        return None
+    
+    def _remember_result(self, frame_hash, result):
+        """Store a parsed result in the LRU frame cache"""
+        self._result_cache[frame_hash] = result
+        self._result_cache.move_to_end(frame_hash)
+        while len(self._result_cache) > self.config.SCENE_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+    
+    def _result_from_json(self, result):
+        """Normalize one decoded Gemini detection object"""
+        return {
+            'person_detected': result.get('person_detected', False),
+            'person_centered': result.get('person_centered', False),
+            'confidence': result.get('confidence', 0.0),
+            'position_description': result.get('position_description', ''),
+            'target_ready': result.get('target_ready', False)
+        }
+    
     def parse_gemini_response(self, response_text):
         """Parse Gemini JSON response"""
         try:
-            import json
+            # Pull the JSON object out of any surrounding markdown or prose
+            result = _load_json_reply(response_text, '{')
             
-            # Clean response (remove markdown if present)
-            clean_response = response_text.replace('```json', '').replace('```', '').strip()
+            return self._result_from_json(result)
             
-            # Parse JSON
-            result = json.loads(clean_response)
+        except Exception as e:
+            logger.warning("❌ Error parsing Gemini response: %s", e)
+            logger.debug("Raw response: %s", response_text)
+            return None
+    
+    def parse_gemini_batch_response(self, response_text):
+        """Parse a Gemini JSON array response into one result per frame"""
+        try:
+            # Pull the JSON array out of any surrounding markdown or prose;
+            # a single-frame batch comes back as a bare object
+            results = _load_json_reply(response_text)
+            if isinstance(results, dict):
+                results = [results]
             
-            return {
-                'person_detected': result.get('person_detected', False),
-                'person_centered': result.get('person_centered', False),
-                'confidence': result.get('confidence', 0.0),
-                'position_description': result.get('position_description', ''),
-                'target_ready': result.get('target_ready', False)
-            }
+            return [self._result_from_json(result) for result in results]
             
         except Exception as e:
-            print(f"❌ Error parsing Gemini response: {e}")
-            print(f"Raw response: {response_text}")
+            logger.warning("❌ Error parsing Gemini response: %s", e)
+            logger.debug("Raw response: %s", response_text)
             return None
     
+    def _create_http_session(self):
+        """Create a keep-alive session for commands to the Raspberry Pi"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=2,
+            max_retries=Retry(total=1, backoff_factor=0.1)
+        )
+        session.mount(f"http://{self.config.PI_IP}:{self.config.PI_PORT}/", adapter)
+        return session
+    
     def send_movement_command(self):
         """Send movement command to Raspberry Pi"""
         try:
@@ -241,7 +465,7 @@ class GeminiBmpDetector:
             
             payload = {'injury': True}
             
-            response = requests.post(
+            response = self.http.post(
                 self.config.PI_CONTROL_URL,
                 json=payload,
                 timeout=2,
@@ -266,82 +490,160 @@ class GeminiBmpDetector:
             print(f"❌ Failed to send movement command: {e}")
             return False
     
-    def detection_loop(self):
-        """Main detection loop using organized BMP files"""
-        print("🎯 Starting Gemini BMP-based survivor detection...")
-        print(f"📸 Using main camera (ID: {self.config.BODY_CAMERA_ID})")
-        print(f"⚡ Frame rate: {self.config.MOVEMENT_FRAME_RATE}s intervals")
-        print(f"📁 Saving frames to: {self.gemini_frames_dir}/")
-        
+    async def capture_loop(self):
+        """Pipeline stage 1: capture and encode frames while Gemini is busy"""
         frame_count = 0
         
-        # Clean up old files at start
-        self.cleanup_old_files(keep_last=5)
-        
-        while self.running and not self.target_locked:
+        while not self._stop_event.is_set() and not self.target_locked:
+            # Pace from the start of the iteration so capture time counts toward the interval
+            deadline = time.monotonic() + self.config.MOVEMENT_FRAME_RATE
             try:
                 frame_count += 1
                 
-                print(f"📸 Capturing frame #{frame_count}")
-                
-                # Capture and save as organized BMP
-                bmp_path = self.capture_and_save_bmp(frame_count)
-                
-                if bmp_path:
-                    # Analyze BMP with Gemini
-                    analysis = self.analyze_bmp_with_gemini(bmp_path)
-                    
-                    if analysis:
-                        result = self.parse_gemini_response(analysis)
-                        
-                        if result:
-                            print(f"🔍 Detection Result:")
-                            print(f"   📄 BMP: {os.path.basename(bmp_path)}")
-                            print(f"   👤 Person detected: {result['person_detected']}")
-                            print(f"   🎯 Person centered: {result['person_centered']}")
-                            print(f"   📈 Confidence: {result['confidence']:.2f}")
-                            print(f"   📍 Position: {result['position_description']}")
-                            
-                            # Check if target is ready
-                            if result['target_ready'] and result['confidence'] > 0.7:
-                                print(f"\n🎯 TARGET ACQUIRED AND CENTERED!")
-                                print(f"🚨 DROPPING KEYWORD: {self.config.TARGET_KEYWORD}")
-                                
-                                # Save special target frame
-                                target_frame = self.save_target_frame(frame_count)
-                                if target_frame:
-                                    print(f"💾 Target frame: {os.path.basename(target_frame)}")
-                                
-                                self.target_locked = True
-                                self.trigger_movement()
-                                break
-                            
-                            elif result['person_detected']:
-                                print(f"👁️  Person detected but not centered - continuing scan...")
-                        
-                        else:
-                            print("⚪ No clear detection - continuing scan...")
+                logger.debug("📸 Capturing frame #%d", frame_count)
                 
+                # Camera read, encode and hash block, so they run off the event loop
+                item = await asyncio.to_thread(self._capture_item, frame_count)
+                if item:
+                    self._enqueue_frame(item)
                 else:
-                    print("❌ Failed to capture BMP frame")
+                    logger.warning("❌ Failed to capture frame")
                 
                 # Clean up periodically
                 if frame_count % 10 == 0:
-                    self.cleanup_old_files(keep_last=5)
+                    await asyncio.to_thread(self.cleanup_old_files, 5)
                 
-                # Wait before next frame
-                time.sleep(self.config.MOVEMENT_FRAME_RATE)
+                # Wait out whatever is left of this frame's interval
+                sleep_for = deadline - time.monotonic()
+                if sleep_for > 0:
+                    await self._wait_for_stop(sleep_for)
                 
             except Exception as e:
-                print(f"❌ Detection loop error: {e}")
-                time.sleep(1)
+                logger.error("❌ Capture loop error: %s", e)
+                await self._wait_for_stop(1)
+    
+    def _capture_item(self, frame_count):
+        """Capture, encode and hash one frame; returns a frame queue item or None"""
+        # Capture frame; the optional debug archive is written in the background
+        frame, frame_path = self.capture_and_save_bmp(frame_count)
+        if frame is None:
+            return None
+        
+        # Only the capture loop encodes here, so one resize target serves every frame;
+        # imencode copies into its own output before the next capture overwrites it
+        if self._encode_buffer is None:
+            size = self.config.GEMINI_INPUT_SIZE
+            self._encode_buffer = np.empty((size, size, 3), np.uint8)
+        jpeg_bytes = self.encode_jpeg(frame, self._encode_buffer)
+        if not jpeg_bytes:
+            return None
+        
+        return frame_count, frame_path, jpeg_bytes, perceptual_hash(frame)
+    
+    def _enqueue_frame(self, item):
+        """Queue an encoded frame, dropping the oldest so Gemini sees the freshest"""
+        try:
+            self.frame_queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.frame_queue.get_nowait()
+            self.frame_queue.put_nowait(item)
+    
+    async def _wait_for_stop(self, timeout):
+        """Sleep up to timeout seconds, waking immediately when detection is stopped"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def detection_loop(self):
+        """Pipeline stage 2: send queued frames to Gemini and act on the results"""
+        logger.info("🎯 Starting Gemini BMP-based survivor detection...")
+        logger.info("📸 Using main camera (ID: %s)", self.config.BODY_CAMERA_ID)
+        logger.info("⚡ Frame rate: %ss intervals", self.config.MOVEMENT_FRAME_RATE)
+        logger.info("📁 Saving frames to: %s/", self.gemini_frames_dir)
+        
+        # Clean up old files at start
+        await asyncio.to_thread(self.cleanup_old_files, 5)
+        
+        # Capture runs concurrently so the next frame is ready when Gemini answers
+        capture_task = asyncio.create_task(self.capture_loop())
+        batch_size = self.config.GEMINI_BATCH_SIZE
+        
+        try:
+            while not self._stop_event.is_set() and not self.target_locked:
+                try:
+                    try:
+                        batch = [await asyncio.wait_for(self.frame_queue.get(), timeout=1)]
+                    except asyncio.TimeoutError:
+                        continue
+                    
+                    # Take whatever else is already queued, up to one batch
+                    while len(batch) < batch_size and not self.frame_queue.empty():
+                        batch.append(self.frame_queue.get_nowait())
+                    
+                    # Act on the newest frame; earlier frames only add context
+                    frame_count, frame_path, _, frame_hash = batch[-1]
+                    result = self._lookup_cached_result(frame_hash)
+                    
+                    if result:
+                        logger.debug("♻️  Frame #%d unchanged - reusing previous Gemini result", frame_count)
+                    else:
+                        # Analyze the encoded frames with Gemini in one request
+                        analysis = await self.analyze_jpeg_batch([item[2] for item in batch])
+                        results = self.parse_gemini_batch_response(analysis) if analysis else None
+                        
+                        if results and len(results) == len(batch):
+                            for item, item_result in zip(batch, results):
+                                self._remember_result(item[3], item_result)
+                        result = results[-1] if results else None
+                    
+                    if result:
+                        logger.info("🔍 Frame #%d (%d frame batch): person=%s centered=%s confidence=%.2f",
+                                    frame_count, len(batch), result['person_detected'],
+                                    result['person_centered'], result['confidence'])
+                        if logger.isEnabledFor(logging.DEBUG):
+                            if frame_path:
+                                logger.debug("   📄 Frame: %s", frame_path.name)
+                            logger.debug("   📍 Position: %s", result['position_description'])
+                        
+                        # Check if target is ready
+                        if result['target_ready'] and result['confidence'] > 0.7:
+                            logger.info("🎯 TARGET ACQUIRED AND CENTERED!")
+                            logger.info("🚨 DROPPING KEYWORD: %s", self.config.TARGET_KEYWORD)
+                            
+                            # Stop the capture stage before grabbing the target frame
+                            self.target_locked = True
+                            
+                            # Save special target frame
+                            target_frame = await asyncio.to_thread(self.save_target_frame, frame_count)
+                            if target_frame:
+                                logger.info("💾 Target frame: %s", target_frame.name)
+                            
+                            await asyncio.to_thread(self.trigger_movement)
+                            break
+                        
+                        elif result['person_detected']:
+                            logger.debug("👁️  Person detected but not centered - continuing scan...")
+                    
+                    else:
+                        logger.debug("⚪ No clear detection - continuing scan...")
+                
+                except Exception as e:
+                    logger.error("❌ Detection loop error: %s", e)
+                    await self._wait_for_stop(1)
+        
+        finally:
+            capture_task.cancel()
+            await asyncio.gather(capture_task, return_exceptions=True)
+            # Hand the device back as soon as detection ends so TwelveLabs recording can open it
+            await asyncio.to_thread(self.release_camera)
         
         if self.target_locked:
-            print("✅ Gemini BMP detection phase completed successfully")
-            print(f"📁 Detection frames saved in: {self.gemini_frames_dir}/")
-            print("🎥 Camera ready for TwelveLabs analysis")
+            logger.info("✅ Gemini BMP detection phase completed successfully")
+            logger.info("📁 Detection frames saved in: %s/", self.gemini_frames_dir)
+            logger.info("🎥 Camera ready for TwelveLabs analysis")
         else:
-            print("🛑 Detection stopped without target lock")
+            logger.info("🛑 Detection stopped without target lock")
     
     def trigger_movement(self):
         """Drop the keyword AND send HTTP request to Pi"""
@@ -368,6 +670,19 @@ class GeminiBmpDetector:
         print(f"📸 Same camera + BMP format ready for TwelveLabs")
         print(f"{'='*50}")
         
+    def _ensure_event_loop(self):
+        """Start the detector's event loop thread on first use"""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.detection_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.detection_thread.start()
+    
+    async def _await_pending_tasks(self):
+        """Wait for every other task on the detector loop to finish unwinding"""
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        await asyncio.gather(*pending, return_exceptions=True)
+    
     def start_detection(self):
         """Start the organized BMP-based detection system"""
         if self.running:
@@ -381,27 +696,28 @@ class GeminiBmpDetector:
         print(f"📸 Testing main camera (ID: {self.config.BODY_CAMERA_ID})...")
         
         # Save test frame in temp directory (NOT root)
-        test_path = os.path.join(self.temp_files_dir, "camera_test.bmp")
-        cap = cv2.VideoCapture(self.config.BODY_CAMERA_ID)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            cap.release()
+        test_path = self.temp_files_dir / "camera_test.bmp"
+        if self.setup_camera():
+            ret, frame = self.read_frame()
             if ret and frame is not None:
-                cv2.imwrite(test_path, frame)
+                cv2.imwrite(str(test_path), frame)
                 print(f"✅ Camera working - Test saved: {test_path}")
             else:
                 print("❌ Camera capture failed")
+                self.release_camera()
                 return False
         else:
             print(f"❌ Cannot access camera {self.config.BODY_CAMERA_ID}!")
             return False
         
-        # Start detection thread
+        # Start detection event loop on its own thread
         self.running = True
         self.target_locked = False
-        self.detection_thread = threading.Thread(target=self.detection_loop)
-        self.detection_thread.daemon = True
-        self.detection_thread.start()
+        self._stop_event = asyncio.Event()
+        # Holds at most one batch so analysis sees fresh frames
+        self.frame_queue = asyncio.Queue(maxsize=max(1, self.config.GEMINI_BATCH_SIZE))
+        self._ensure_event_loop()
+        self._detection_future = asyncio.run_coroutine_threadsafe(self.detection_loop(), self.loop)
         
         print("✅ Organized BMP detection thread started")
         return True
@@ -411,8 +727,18 @@ class GeminiBmpDetector:
         print("🛑 Stopping Gemini BMP detection...")
         self.running = False
         
-        if self.detection_thread and self.detection_thread.is_alive():
-            self.detection_thread.join(timeout=5)
+        if self._detection_future is not None:
+            # Wake pending sleeps and queue waits, and cancel an in-flight Gemini request
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+            self._detection_future.cancel()
+            try:
+                # Wait until the cancelled coroutines have run their cleanup on the loop
+                asyncio.run_coroutine_threadsafe(self._await_pending_tasks(), self.loop).result(timeout=5)
+            except Exception as e:
+                print(f"⚠️  Detection loop did not finish cleanly: {e}")
+            self._detection_future = None
+        
+        self.release_camera()
         
         print("✅ Gemini BMP detection stopped")
         print("📸 Camera released for TwelveLabs system")
@@ -423,7 +749,7 @@ class GeminiBmpDetector:
             'running': self.running,
             'target_locked': self.target_locked,
             'camera_id': self.config.BODY_CAMERA_ID,
-            'frames_directory': self.gemini_frames_dir
+            'frames_directory': str(self.gemini_frames_dir)
         }
 
 # Test function
@@ -455,8 +781,8 @@ def test_organized_detection():
                 
                 # Show final organization
                 print(f"\n📁 Final file organization:")
-                if os.path.exists(detector.gemini_frames_dir):
-                    files = os.listdir(detector.gemini_frames_dir)
+                if detector.gemini_frames_dir.exists():
+                    files = [p.name for p in detector.gemini_frames_dir.iterdir()]
                     print(f"   📸 Detection frames: {len(files)} files in {detector.gemini_frames_dir}/")
                     for f in sorted(files)[-3:]:  # Show last 3 files
                         print(f"      - {f}")
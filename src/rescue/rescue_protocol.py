@@ -1,14 +1,50 @@
 import time
-import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from ..config import Config
+from ..config import get_config
+
+try:
+    import orjson
+
+    def _json_bytes(data):
+        return orjson.dumps(data)
+except ImportError:
+    import json
+
+    def _json_bytes(data):
+        return json.dumps(data, separators=(',', ':')).encode()
 
 class RescueProtocol:
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
         self.rescue_active = False
         self.rescue_start_time = None
+        # Scans are analyzed concurrently; only one rescue runs at a time
+        self._rescue_lock = threading.Lock()
+        # Rescues can land within the same second, so ids carry ms plus a sequence number
+        self._rescue_seq = 0
+        self.rescue_stamp = None
+        # Report files are written off the rescue path
+        self._report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescue_report")
+
+    def _write_json_file(self, filename, data, label):
+        """Write a compact JSON document to disk"""
+        try:
+            payload = _json_bytes(data)
+            with open(filename, 'wb') as f:
+                f.write(payload)
+            print(f"   📄 {label} saved: {filename}")
+        except (OSError, TypeError, ValueError) as e:
+            # Runs on the report executor, so nobody else sees the exception - report it here
+            # (orjson.JSONEncodeError is a TypeError)
+            print(f"   ❌ Could not save {label.lower()} {filename}: {e}")
+
+    def _simulate_delay(self, seconds):
+        """Stand in for hardware action time; skipped unless SIMULATE_HARDWARE is set"""
+        if self.config.SIMULATE_HARDWARE:
+            time.sleep(seconds)
 
     def activate_rescue_protocol(self, detection_payload):
         """Compatibility wrapper for detection pipeline payloads."""
@@ -26,26 +62,29 @@ class RescueProtocol:
         
     def handle_survivor_detection(self, detection_data):
         """Handle survivor detection and initiate rescue protocol"""
-        priority_level = detection_data.get('priority_level', 'MEDIUM')
-        print(f"\n🚨 RESCUE PROTOCOL ACTIVATED")
-        print(f"Priority: {priority_level}")
-        
-        self.rescue_active = True
-        self.rescue_start_time = time.time()
-        
-        # Step 1: Immediate response
-        self._immediate_response(detection_data)
-        
-        # Step 2: Medical assessment
-        self._medical_response(detection_data)
-        
-        # Step 3: Base station communication
-        self._communicate_with_base(detection_data)
-        
-        # Step 4: Documentation
-        self._document_rescue_attempt(detection_data)
-        
-        print("✅ Rescue protocol completed")
+        with self._rescue_lock:
+            priority_level = detection_data.get('priority_level', 'MEDIUM')
+            print(f"\n🚨 RESCUE PROTOCOL ACTIVATED")
+            print(f"Priority: {priority_level}")
+            
+            self.rescue_active = True
+            self.rescue_start_time = time.time()
+            self._rescue_seq += 1
+            self.rescue_stamp = f"{int(self.rescue_start_time * 1000)}_{self._rescue_seq}"
+            
+            # Step 1: Immediate response
+            self._immediate_response(detection_data)
+            
+            # Step 2: Medical assessment
+            self._medical_response(detection_data)
+            
+            # Step 3: Base station communication
+            self._communicate_with_base(detection_data)
+            
+            # Step 4: Documentation
+            self._document_rescue_attempt(detection_data)
+            
+            print("✅ Rescue protocol completed")
     
     def _immediate_response(self, detection_data):
         """Immediate response actions"""
@@ -61,7 +100,7 @@ class RescueProtocol:
         print("   📍 Positioning rover for optimal view")
         
         # Wait for positioning
-        time.sleep(2)
+        self._simulate_delay(2)
         
         print("   ✅ Immediate response completed")
     
@@ -90,7 +129,7 @@ class RescueProtocol:
         print("     💉 Preparing trauma supplies")
         print("     🩸 Readying blood loss control items")
         # TODO: Integrate with rover's mechanical arm/claw
-        time.sleep(3)
+        self._simulate_delay(3)
         print("     ✅ Critical supplies deployed")
     
     def _deploy_standard_medical_supplies(self):
@@ -99,14 +138,14 @@ class RescueProtocol:
         print("     🩹 Preparing bandages and antiseptic")
         print("     💊 Readying pain medication")
         # TODO: Integrate with rover's mechanical arm/claw
-        time.sleep(2)
+        self._simulate_delay(2)
         print("     ✅ Standard supplies deployed")
     
     def _prepare_basic_first_aid(self):
         """Prepare basic first aid"""
         print("     📦 Preparing basic first aid assessment")
         print("     🔍 Visual assessment tools ready")
-        time.sleep(1)
+        self._simulate_delay(1)
         print("     ✅ Basic assessment ready")
     
     def _start_voice_communication(self, detection_data):
@@ -131,19 +170,21 @@ class RescueProtocol:
         # engine.say(message)
         # engine.runAndWait()
         
-        time.sleep(2)
+        self._simulate_delay(2)
         print("   ✅ Voice communication initiated")
     
     def _communicate_with_base(self, detection_data):
         """Send detailed report to base station"""
         print("📡 BASE STATION COMMUNICATION:")
         
+        now = datetime.now()
+        
         # Prepare comprehensive report
         base_report = {
             'mission_id': self.config.MISSION_ID,
             'rover_name': self.config.ROVER_NAME,
             'alert_type': 'SURVIVOR_DETECTION',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'location': detection_data.get('rover_location', 'unknown'),
             'survivors': {
                 'count': detection_data.get('total_survivors', 0),
@@ -164,17 +205,14 @@ class RescueProtocol:
         # Save report locally
         report_filename = os.path.join(
             self.config.RESCUE_REPORTS_DIR,
-            f"rescue_report_{int(time.time())}.json"
+            f"rescue_report_{self.rescue_stamp}.json"
         )
-        with open(report_filename, 'w') as f:
-            json.dump(base_report, f, indent=2)
-        
-        print(f"   📄 Report saved: {report_filename}")
+        self._report_executor.submit(self._write_json_file, report_filename, base_report, "Report")
         
         # TODO: Implement actual base station communication
         # This could be via radio, cellular, or satellite communication
         print("   📡 Transmitting to base station...")
-        time.sleep(3)
+        self._simulate_delay(3)
         print("   ✅ Base station notified")
         
         # Print summary for demonstration
@@ -224,12 +262,13 @@ class RescueProtocol:
         """Document the rescue attempt"""
         print("📝 RESCUE DOCUMENTATION:")
         
+        now = datetime.now()
         rescue_log = {
-            'rescue_id': f"rescue_{int(time.time())}",
+            'rescue_id': f"rescue_{self.rescue_stamp}",
             'mission_id': self.config.MISSION_ID,
             'rover_name': self.config.ROVER_NAME,
-            'timestamp': datetime.now().isoformat(),
-            'rescue_duration': time.time() - self.rescue_start_time,
+            'timestamp': now.isoformat(),
+            'rescue_duration': now.timestamp() - self.rescue_start_time,
             'detection_data': detection_data,
             'actions_taken': [
                 'Survivor detection confirmed',
@@ -247,10 +286,7 @@ class RescueProtocol:
             self.config.RESCUE_LOGS_DIR,
             f"rescue_log_{rescue_log['rescue_id']}.json"
         )
-        with open(log_filename, 'w') as f:
-            json.dump(rescue_log, f, indent=2)
-        
-        print(f"   📄 Rescue log saved: {log_filename}")
+        self._report_executor.submit(self._write_json_file, log_filename, rescue_log, "Rescue log")
         print("   ✅ Documentation completed")
     
     def emergency_stop(self):